@@ -5,31 +5,25 @@ pattern excels when your organization’s knowledge lives across distinct vertic
 knowledge domains that each require their own agent with specialized tools and prompts.
 """
 
-import operator
-from typing import Annotated, Literal, TypedDict
+import asyncio
+import re
+from collections import defaultdict
+from itertools import combinations
+from typing import Literal, TypedDict
 
 from dotenv import load_dotenv
 from langchain.agents import create_agent
 from langchain.chat_models import init_chat_model
+from langchain.messages import HumanMessage
 from langchain.tools import tool
+from langgraph.errors import GraphRecursionError
 from langgraph.graph import END, START, StateGraph
-from langgraph.types import Send
 from pydantic import BaseModel, Field
 
 load_dotenv()
 
 
-model = init_chat_model("openai:gpt-5-mini-2025-08-07")
-router_llm = init_chat_model("openai:gpt-5-nano-2025-08-07")
-
-
 # State definitions
-class AgentInput(TypedDict):
-    """Simple input state for each subagent."""
-
-    query: str
-
-
 class AgentOutput(TypedDict):
     """Output from each subagent."""
 
@@ -47,7 +41,7 @@ class Classification(TypedDict):
 class RouterState(TypedDict):
     query: str
     classifications: list[Classification]
-    results: Annotated[list[AgentOutput], operator.add]
+    results: list[AgentOutput]  # written once by query_all, so no reducer is needed
     final_answer: str
 
 
@@ -104,6 +98,7 @@ def get_thread(thread_id: str) -> str:
 # Models and agents
 model = init_chat_model("openai:gpt-4.1")
 router_llm = init_chat_model("openai:gpt-4.1-mini")
+structured_router = router_llm.with_structured_output(ClassificationResult)
 
 github_agent = create_agent(
     model,
@@ -135,17 +130,15 @@ slack_agent = create_agent(
     ),
 )
 
+AGENT_MAP = {"github": github_agent, "notion": notion_agent, "slack": slack_agent}
 
-# Workflow nodes
-def classify_query(state: RouterState) -> dict:
-    """Classify query and determine which agents to invoke."""
-    structured_llm = router_llm.with_structured_output(ClassificationResult)
+# Caps each subagent at 6 graph steps (model -> tools -> model -> tools -> model), i.e. two tool
+# rounds before its final answer, to bound tail latency from runaway tool loops
+AGENT_CONFIG = {"recursion_limit": 6}
 
-    result = structured_llm.invoke(
-        [
-            {
-                "role": "system",
-                "content": """Analyze this query and determine which knowledge bases to consult.
+
+# Prompts as constants so they are not rebuilt on every call
+CLASSIFY_PROMPT = """Analyze this query and determine which knowledge bases to consult.
 For each relevant source, generate a targeted sub-question optimized for that source.
 
 Available sources:
@@ -153,57 +146,100 @@ Available sources:
 - notion: Internal documentation, processes, policies, team wikis
 - slack: Team discussions, informal knowledge sharing, recent conversations
 
-Return ONLY the sources that are relevant to the query.""",
-            },
+Return ONLY the sources that are relevant to the query."""
+
+SYNTHESIZE_PROMPT = """Synthesize these search results to answer the original question: "{query}"
+
+- Combine information from multiple sources without redundancy
+- Highlight the most relevant and actionable information
+- Note any discrepancies between sources
+- Keep the response concise and well-organized"""
+
+
+# Classifications keyed by normalized query, oldest entry evicted first once full
+CLASSIFY_CACHE_SIZE = 1024
+_classify_cache: dict[str, list[Classification]] = {}
+
+
+# Workflow nodes
+async def classify_query(state: RouterState) -> dict:
+    """Classify query and determine which agents to invoke."""
+    key = state["query"].strip().lower()
+    hit = _classify_cache.get(key)
+    if hit is not None:
+        return {"classifications": hit}
+
+    result = await structured_router.ainvoke(
+        [
+            {"role": "system", "content": CLASSIFY_PROMPT},
             {"role": "user", "content": state["query"]},
         ]
     )
 
+    if len(_classify_cache) >= CLASSIFY_CACHE_SIZE:
+        del _classify_cache[next(iter(_classify_cache))]
+    _classify_cache[key] = result.classifications
     return {"classifications": result.classifications}
 
 
-def route_to_agents(state: RouterState) -> list[Send]:
-    """Fan out to agents based on classifications."""
-    return [Send(c["source"], {"query": c["query"]}) for c in state["classifications"]]
+async def ask_agent(source: str, query: str) -> str:
+    """Query one agent, falling back to a short note if it runs out of steps."""
+    try:
+        result = await AGENT_MAP[source].ainvoke({"messages": [HumanMessage(query)]}, AGENT_CONFIG)
+    except GraphRecursionError:
+        return f"The {source} agent hit its step limit before producing an answer."
+    return result["messages"][-1].content
+
+
+async def query_all(state: RouterState) -> dict:
+    """Query every classified agent concurrently and collect their answers."""
+    # Merge sub-questions aimed at the same source so each agent is called once
+    merged: defaultdict[str, list[str]] = defaultdict(list)
+    for c in state["classifications"]:
+        merged[c["source"]].append(c["query"])
+
+    outputs = await asyncio.gather(*(ask_agent(source, " Also: ".join(queries)) for source, queries in merged.items()))
+    return {"results": [{"source": source, "result": output} for source, output in zip(merged, outputs)]}
 
 
-def query_github(state: AgentInput) -> dict:
-    """Query the GitHub agent."""
-    result = github_agent.invoke({"messages": [{"role": "user", "content": state["query"]}]})
-    return {"results": [{"source": "github", "result": result["messages"][-1].content}]}
+def needs_synthesis(state: RouterState) -> Literal["synthesize", "shortcut"]:
+    """Skip synthesis when exactly one source answered the query."""
+    return "shortcut" if len(state["results"]) == 1 else "synthesize"
 
 
-def query_notion(state: AgentInput) -> dict:
-    """Query the Notion agent."""
-    result = notion_agent.invoke({"messages": [{"role": "user", "content": state["query"]}]})
-    return {"results": [{"source": "notion", "result": result["messages"][-1].content}]}
+def shortcut(state: RouterState) -> dict:
+    """Return the lone agent answer as the final answer."""
+    return {"final_answer": state["results"][0]["result"]}
 
 
-def query_slack(state: AgentInput) -> dict:
-    """Query the Slack agent."""
-    result = slack_agent.invoke({"messages": [{"role": "user", "content": state["query"]}]})
-    return {"results": [{"source": "slack", "result": result["messages"][-1].content}]}
+# Short, mostly non-overlapping results are concatenated instead of synthesized by the LLM
+SYNTHESIS_SKIP_MAX_CHARS = 2000
+SYNTHESIS_SKIP_MAX_OVERLAP = 0.1
 
 
-def synthesize_results(state: RouterState) -> dict:
+def _no_conflicts(results: list[AgentOutput]) -> bool:
+    """Heuristic: results that share few keywords cover different ground and need no reconciling."""
+    keywords = [set(re.findall(r"[a-z]{5,}", r["result"].lower())) for r in results]
+    for a, b in combinations(keywords, 2):
+        if a and b and len(a & b) / len(a | b) > SYNTHESIS_SKIP_MAX_OVERLAP:
+            return False
+    return True
+
+
+async def synthesize_results(state: RouterState) -> dict:
     """Combine results from all agents into a coherent answer."""
     if not state["results"]:
         return {"final_answer": "No results found from any knowledge source."}
 
     formatted = [f"**From {r['source'].title()}:**\n{r['result']}" for r in state["results"]]
+    joined = "\n\n".join(formatted)
+    if len(joined) < SYNTHESIS_SKIP_MAX_CHARS and _no_conflicts(state["results"]):
+        return {"final_answer": joined}
 
-    synthesis_response = router_llm.invoke(
+    synthesis_response = await router_llm.ainvoke(
         [
-            {
-                "role": "system",
-                "content": f"""Synthesize these search results to answer the original question: "{state["query"]}"
-
-- Combine information from multiple sources without redundancy
-- Highlight the most relevant and actionable information
-- Note any discrepancies between sources
-- Keep the response concise and well-organized""",
-            },
-            {"role": "user", "content": "\n\n".join(formatted)},
+            {"role": "system", "content": SYNTHESIZE_PROMPT.format(query=state["query"])},
+            {"role": "user", "content": joined},
         ]
     )
 
@@ -214,27 +250,41 @@ def synthesize_results(state: RouterState) -> dict:
 workflow = (
     StateGraph(RouterState)
     .add_node("classify", classify_query)
-    .add_node("github", query_github)
-    .add_node("notion", query_notion)
-    .add_node("slack", query_slack)
+    .add_node("query_all", query_all)
     .add_node("synthesize", synthesize_results)
+    .add_node("shortcut", shortcut)
     .add_edge(START, "classify")
-    .add_conditional_edges("classify", route_to_agents, ["github", "notion", "slack"])
-    .add_edge("github", "synthesize")
-    .add_edge("notion", "synthesize")
-    .add_edge("slack", "synthesize")
+    .add_edge("classify", "query_all")
+    .add_conditional_edges("query_all", needs_synthesis, ["synthesize", "shortcut"])
     .add_edge("synthesize", END)
+    .add_edge("shortcut", END)
     .compile()
 )
 
 
+async def main(query: str) -> None:
+    """Run the workflow, printing synthesis tokens as they arrive."""
+    print("Original query:", query)
+    streamed = False
+    async for mode, chunk in workflow.astream({"query": query}, stream_mode=["updates", "messages"]):
+        if mode == "messages":
+            message, metadata = chunk
+            if metadata["langgraph_node"] == "synthesize":
+                print(message.content, end="", flush=True)
+                streamed = True
+        elif "classify" in chunk:
+            print("\nClassifications:")
+            for c in chunk["classify"]["classifications"]:
+                print(f"  {c['source']}: {c['query']}")
+            print("\n" + "=" * 60 + "\n")
+            print("Final Answer:")
+        elif "shortcut" in chunk:
+            print(chunk["shortcut"]["final_answer"], end="")
+        elif "synthesize" in chunk and not streamed:
+            # Synthesis was skipped without an LLM call, so there were no tokens to stream
+            print(chunk["synthesize"]["final_answer"], end="")
+    print()
+
+
 if __name__ == "__main__":
-    result = workflow.invoke({"query": "How do I authenticate API requests?"})
-
-    print("Original query:", result["query"])
-    print("\nClassifications:")
-    for c in result["classifications"]:
-        print(f"  {c['source']}: {c['query']}")
-    print("\n" + "=" * 60 + "\n")
-    print("Final Answer:")
-    print(result["final_answer"])
+    asyncio.run(main("How do I authenticate API requests?"))
@@ -11,7 +11,7 @@ from dotenv import load_dotenv
 from langchain.agents import create_agent
 from langchain.agents.middleware import AgentMiddleware, AgentState, ModelRequest, ModelResponse
 from langchain.chat_models import init_chat_model
-from langchain.messages import SystemMessage, ToolMessage
+from langchain.messages import HumanMessage, SystemMessage, ToolMessage
 from langchain.tools import ToolRuntime, tool
 from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.types import Command
@@ -19,7 +19,8 @@ from langgraph.types import Command
 load_dotenv()
 
 
-model = init_chat_model("openai:gpt-5-nano-2025-08-07")
+# A stable cache key routes requests with the same system prefix to the same OpenAI prompt cache
+model = init_chat_model("openai:gpt-5-nano-2025-08-07", model_kwargs={"prompt_cache_key": "skills_sys_v1"})
 
 
 class Skill(TypedDict):
@@ -161,6 +162,9 @@ ORDER BY units_to_reorder DESC;
     },
 ]
 
+SKILL_CONTENT: dict[str, str] = {s["name"]: f"Loaded skill: {s['name']}\n\n{s['content']}" for s in SKILLS}
+SKILLS_AVAILABLE_STR = ", ".join(SKILL_CONTENT)
+
 
 @tool
 def load_skill(skill_name: str, runtime: ToolRuntime) -> Command:
@@ -173,34 +177,31 @@ def load_skill(skill_name: str, runtime: ToolRuntime) -> Command:
     Args:
         skill_name: The name of the skill to load (e.g., "expense_reporting", "travel_booking")
     """
-    # Find and return the requested skill
-    for skill in SKILLS:
-        if skill["name"] == skill_name:
-            skill_content = f"Loaded skill: {skill_name}\n\n{skill['content']}"
-
-            # Update state to track loaded skill
-            return Command(
-                update={
-                    "messages": [
-                        ToolMessage(
-                            content=skill_content,
-                            tool_call_id=runtime.tool_call_id,
-                        )
-                    ],
-                    "skills_loaded": [skill_name],
-                }
-            )
+    skill_content = SKILL_CONTENT.get(skill_name)
 
     # Skill not found
-    available = ", ".join(s["name"] for s in SKILLS)
+    if skill_content is None:
+        return Command(
+            update={
+                "messages": [
+                    ToolMessage(
+                        content=f"Skill '{skill_name}' not found. Available skills: {SKILLS_AVAILABLE_STR}",
+                        tool_call_id=runtime.tool_call_id,
+                    )
+                ]
+            }
+        )
+
+    # Update state to track loaded skill
     return Command(
         update={
             "messages": [
                 ToolMessage(
-                    content=f"Skill '{skill_name}' not found. Available skills: {available}",
+                    content=skill_content,
                     tool_call_id=runtime.tool_call_id,
                 )
-            ]
+            ],
+            "skills_loaded": [skill_name],
         }
     )
 
@@ -249,21 +250,24 @@ class SkillMiddleware(AgentMiddleware):
             skills_list.append(f"- **{skill['name']}**: {skill['description']}")
         self.skills_prompt = "\n".join(skills_list)
 
+        # The addendum never changes, so build its content block once
+        self._addendum_block = {
+            "type": "text",
+            "text": (
+                f"\n\n## Available Skills\n\n{self.skills_prompt}\n\n"
+                "Use the load_skill tool when you need detailed information "
+                "about handling a specific type of request."
+            ),
+        }
+
     def wrap_model_call(
         self,
         request: ModelRequest,
         handler: Callable[[ModelRequest], ModelResponse],
     ) -> ModelResponse:
         """Sync: Inject skill descriptions into system prompt."""
-        # Build the skills addendum
-        skills_addendum = (
-            f"\n\n## Available Skills\n\n{self.skills_prompt}\n\n"
-            "Use the load_skill tool when you need detailed information "
-            "about handling a specific type of request."
-        )
-
         # Append to system message content blocks
-        new_content = list(request.system_message.content_blocks) + [{"type": "text", "text": skills_addendum}]
+        new_content = [*request.system_message.content_blocks, self._addendum_block]
         new_system_message = SystemMessage(content=new_content)
         modified_request = request.override(system_message=new_system_message)
         return handler(modified_request)
@@ -274,7 +278,7 @@ agent = create_agent(
     model,
     system_prompt=("You are a SQL query assistant that helps users write queries against business databases."),
     middleware=[SkillMiddleware()],
-    checkpointer=InMemorySaver(),
+    checkpointer=InMemorySaver(),  # demo only; use a persistent saver (e.g. SqliteSaver, PostgresSaver) in production
 )
 
 
@@ -287,14 +291,7 @@ if __name__ == "__main__":
 
     # Ask for a SQL query
     result = agent.invoke(
-        {
-            "messages": [
-                {
-                    "role": "user",
-                    "content": ("Write a SQL query to find all customers who made orders over $1000 in the last month"),
-                }
-            ]
-        },
+        {"messages": [HumanMessage("Write a SQL query to find all customers who made orders over $1000 in the last month")]},
         config,
     )
 
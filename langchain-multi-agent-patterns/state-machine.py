@@ -10,15 +10,17 @@ underlying agent, selected dynamically based on state.
 """
 
 
-from typing import Callable, Literal
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Literal
 
 from dotenv import load_dotenv
 from langchain.agents import AgentState, create_agent
-from langchain.agents.middleware import ModelRequest, ModelResponse, SummarizationMiddleware, wrap_model_call
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse, SummarizationMiddleware
 from langchain.chat_models import init_chat_model
 from langchain.messages import ToolMessage
-from langchain.tools import ToolRuntime, tool
+from langchain.tools import BaseTool, ToolRuntime, tool
 from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.runtime import Runtime
 from langgraph.types import Command
 from typing_extensions import NotRequired
 
@@ -166,31 +168,48 @@ If the customer indicates any information was wrong, use:
 Be specific and helpful in your solutions."""
 
 
+@dataclass(frozen=True, slots=True)
+class StepSpec:
+    """Static configuration for one workflow step."""
+
+    prompt: str
+    tools: tuple[BaseTool, ...]
+    requires: tuple[str, ...]
+
+
 # Step configuration: maps step name to (prompt, tools, required_state)
-STEP_CONFIG = {
-    "warranty_collector": {
-        "prompt": WARRANTY_COLLECTOR_PROMPT,
-        "tools": [record_warranty_status],
-        "requires": [],
-    },
-    "issue_classifier": {
-        "prompt": ISSUE_CLASSIFIER_PROMPT,
-        "tools": [record_issue_type],
-        "requires": ["warranty_status"],
-    },
-    "resolution_specialist": {
-        "prompt": RESOLUTION_SPECIALIST_PROMPT,
-        "tools": [provide_solution, escalate_to_human, go_back_to_warranty, go_back_to_classification],
-        "requires": ["warranty_status", "issue_type"],
-    },
+STEP_CONFIG: dict[SupportStep, StepSpec] = {
+    "warranty_collector": StepSpec(
+        prompt=WARRANTY_COLLECTOR_PROMPT,
+        tools=(record_warranty_status,),
+        requires=(),
+    ),
+    "issue_classifier": StepSpec(
+        prompt=ISSUE_CLASSIFIER_PROMPT,
+        tools=(record_issue_type,),
+        requires=("warranty_status",),
+    ),
+    "resolution_specialist": StepSpec(
+        prompt=RESOLUTION_SPECIALIST_PROMPT,
+        tools=(provide_solution, escalate_to_human, go_back_to_warranty, go_back_to_classification),
+        requires=("warranty_status", "issue_type"),
+    ),
 }
 
 
-@wrap_model_call
-def apply_step_config(
-    request: ModelRequest,
-    handler: Callable[[ModelRequest], ModelResponse],
-) -> ModelResponse:
+class _StateView:
+    """Non-copying view of the agent state for format_map; unknown placeholders are left in place."""
+
+    __slots__ = ("state",)
+
+    def __init__(self, state: AgentState) -> None:
+        self.state = state
+
+    def __getitem__(self, key: str) -> object:
+        return self.state.get(key, "{" + key + "}")
+
+
+def configure_step(request: ModelRequest) -> ModelRequest:
     """Configure agent behavior based on the current step."""
     # Get current step (defaults to warranty_collector for first interaction)
     current_step = request.state.get("current_step", "warranty_collector")
@@ -199,20 +218,54 @@ def apply_step_config(
     stage_config = STEP_CONFIG[current_step]
 
     # Validate required state exists
-    for key in stage_config["requires"]:
-        if request.state.get(key) is None:
-            raise ValueError(f"{key} must be set before reaching {current_step}")
+    missing = next((key for key in stage_config.requires if request.state.get(key) is None), None)
+    if missing is not None:
+        raise ValueError(f"{missing} must be set before reaching {current_step}")
 
     # Format prompt with state values (supports {warranty_status}, {issue_type}, etc.)
-    system_prompt = stage_config["prompt"].format(**request.state)
+    system_prompt = stage_config.prompt.format_map(_StateView(request.state))
 
     # Inject system prompt and step-specific tools
-    request = request.override(
+    return request.override(
         system_prompt=system_prompt,
-        tools=stage_config["tools"],
+        tools=stage_config.tools,
     )
 
-    return handler(request)
+
+class StepConfigMiddleware(AgentMiddleware):
+    """Middleware that applies the current step's prompt and tools, for both invoke and ainvoke."""
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse:
+        return handler(configure_step(request))
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        return await handler(configure_step(request))
+
+
+class ShortThreadSummarizationMiddleware(SummarizationMiddleware):
+    """Summarization that skips token counting until a thread has enough messages to matter."""
+
+    def __init__(self, *args: Any, min_messages: int = 20, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.min_messages = min_messages
+
+    def before_model(self, state: AgentState, runtime: Runtime) -> dict[str, Any] | None:
+        if len(state["messages"]) < self.min_messages:
+            return None
+        return super().before_model(state, runtime)
+
+    async def abefore_model(self, state: AgentState, runtime: Runtime) -> dict[str, Any] | None:
+        if len(state["messages"]) < self.min_messages:
+            return None
+        return await super().abefore_model(state, runtime)
 
 
 # Collect all tools from all step configurations
@@ -223,48 +276,45 @@ agent = create_agent(
     model,
     tools=all_tools,
     state_schema=SupportState,
-    middleware=[apply_step_config, SummarizationMiddleware(model="gpt-4.1-mini", trigger=("tokens", 4000), keep=("messages", 10))],
-    checkpointer=InMemorySaver(),
+    middleware=[StepConfigMiddleware(), ShortThreadSummarizationMiddleware(model="gpt-4.1-mini", trigger=("tokens", 4000), keep=("messages", 10))],
+    checkpointer=InMemorySaver(),  # demo only; use a persistent saver (e.g. SqliteSaver, PostgresSaver) in production
 )
 
 
 if __name__ == "__main__":
+    import asyncio
     import uuid
 
     from langchain.messages import HumanMessage
 
-    # Configuration for this conversation thread
-    thread_id = str(uuid.uuid4())
-    config = {"configurable": {"thread_id": thread_id}}
-
-    # Turn 1: Initial message - starts with warranty_collector step
-    print("=== Turn 1: Warranty Collection ===")
-    result = agent.invoke({"messages": [HumanMessage("Hi, my phone screen is cracked")]}, config)
-    for msg in result["messages"]:
-        msg.pretty_print()
-
-    # Turn 2: User responds about warranty
-    print("\n=== Turn 2: Warranty Response ===")
-    result = agent.invoke({"messages": [HumanMessage("Yes, it's still under warranty")]}, config)
-    for msg in result["messages"]:
-        msg.pretty_print()
-    print(f"Current step: {result.get('current_step')}")
-
-    # Turn 3: User describes the issue
-    print("\n=== Turn 3: Issue Description ===")
-    result = agent.invoke({"messages": [HumanMessage("The screen is physically cracked from dropping it")]}, config)
-    for msg in result["messages"]:
-        msg.pretty_print()
-    print(f"Current step: {result.get('current_step')}")
-
-    # Turn 4: Go back
-    print("\n=== Turn 4: Go Back ===")
-    result = agent.invoke({"messages": [HumanMessage("Actually, I made a mistake - my device is out of warranty")]}, config)
-    for msg in result["messages"]:
-        msg.pretty_print()
-
-    # Turn 4: Resolution
-    # print("\n=== Turn 4: Resolution ===")
-    # result = agent.invoke({"messages": [HumanMessage("What should I do?")]}, config)
-    # for msg in result["messages"]:
-    #     msg.pretty_print()
+    # Scripted conversations; each runs on its own thread so they can be replayed concurrently
+    TRAJECTORIES = {
+        "Hardware issue, warranty corrected": [
+            "Hi, my phone screen is cracked",  # starts with warranty_collector step
+            "Yes, it's still under warranty",
+            "The screen is physically cracked from dropping it",
+            "Actually, I made a mistake - my device is out of warranty",  # goes back
+        ],
+        "Software issue": [
+            "Hi, my tablet keeps freezing",
+            "No, it's out of warranty",
+            "Apps crash whenever I open the camera",
+        ],
+    }
+
+    async def replay(turns: list[str]) -> list[dict]:
+        """Replay user turns in order on a fresh conversation thread."""
+        config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+        return [await agent.ainvoke({"messages": [HumanMessage(turn)]}, config) for turn in turns]
+
+    async def main() -> None:
+        replays = await asyncio.gather(*(replay(turns) for turns in TRAJECTORIES.values()))
+        for (name, turns), results in zip(TRAJECTORIES.items(), replays):
+            print(f"\n##### {name} #####")
+            for i, (turn, result) in enumerate(zip(turns, results), start=1):
+                print(f"\n=== Turn {i}: {turn} ===")
+                for msg in result["messages"]:
+                    msg.pretty_print()
+                print(f"Current step: {result.get('current_step')}")
+
+    asyncio.run(main())
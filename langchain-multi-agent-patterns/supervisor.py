@@ -8,12 +8,16 @@ coordinated by a supervisor who understands the overall workflow.
 from dotenv import load_dotenv
 from langchain.agents import create_agent
 from langchain.chat_models import init_chat_model
+from langchain.messages import HumanMessage
 from langchain.tools import tool
+from langgraph.errors import GraphRecursionError
+from langgraph.graph.state import CompiledStateGraph
 
 load_dotenv()
 
 
-model = init_chat_model("openai:gpt-5-nano-2025-08-07")
+# A stable cache key routes the agents' repeated system-prompt prefixes to the same OpenAI prompt cache
+model = init_chat_model("openai:gpt-5-nano-2025-08-07", model_kwargs={"prompt_cache_key": "supervisor_sys_v1"})
 
 
 @tool
@@ -81,9 +85,22 @@ email_agent = create_agent(
     system_prompt=EMAIL_AGENT_PROMPT,
 )
 
+# 6 graph steps leave room for the calendar agent's longest normal path (check availability, create
+# the event, confirm) while stopping a sub-agent that keeps calling tools
+AGENT_CONFIG = {"recursion_limit": 6}
+
+
+async def run_subagent(agent: CompiledStateGraph, name: str, request: str) -> str:
+    """Invoke a sub-agent, reporting a step-limit stop to the supervisor instead of raising."""
+    try:
+        result = await agent.ainvoke({"messages": [HumanMessage(request)]}, AGENT_CONFIG)
+    except GraphRecursionError:
+        return f"Error: the {name} assistant hit its step limit before finishing this request."
+    return result["messages"][-1].text
+
 
 @tool
-def schedule_event(request: str) -> str:
+async def schedule_event(request: str) -> str:
     """Schedule calendar events using natural language.
 
     Use this when the user wants to create, modify, or check calendar appointments.
@@ -92,12 +109,11 @@ def schedule_event(request: str) -> str:
     Input: Natural language scheduling request (e.g., 'meeting with design team
     next Tuesday at 2pm')
     """
-    result = calendar_agent.invoke({"messages": [{"role": "user", "content": request}]})
-    return result["messages"][-1].text
+    return await run_subagent(calendar_agent, "calendar", request)
 
 
 @tool
-def manage_email(request: str) -> str:
+async def manage_email(request: str) -> str:
     """Send emails using natural language.
 
     Use this when the user wants to send notifications, reminders, or any email
@@ -107,15 +123,15 @@ def manage_email(request: str) -> str:
     Input: Natural language email request (e.g., 'send them a reminder about
     the meeting')
     """
-    result = email_agent.invoke({"messages": [{"role": "user", "content": request}]})
-    return result["messages"][-1].text
+    return await run_subagent(email_agent, "email", request)
 
 
 SUPERVISOR_PROMPT = (
     "You are a helpful personal assistant. "
     "You can schedule calendar events and send emails. "
     "Break down user requests into appropriate tool calls and coordinate the results. "
-    "When a request involves multiple actions, use multiple tools in sequence."
+    "When a request involves multiple independent actions, call all of the tools in the same turn so they run concurrently; "
+    "only chain tool calls when one action depends on another's result."
 )
 
 supervisor_agent = create_agent(
@@ -126,26 +142,29 @@ supervisor_agent = create_agent(
 
 
 if __name__ == "__main__":
+    import asyncio
+
     # query = "Schedule a team meeting next Tuesday at 2pm for 1 hour"
-    # for step in calendar_agent.stream({"messages": [{"role": "user", "content": query}]}):
+    # for step in calendar_agent.stream({"messages": [HumanMessage(query)]}):
     #     for update in step.values():
     #         for message in update.get("messages", []):
     #             message.pretty_print()
 
     # query = "Send the design team a reminder about reviewing the new mockups"
-    # for step in email_agent.stream({"messages": [{"role": "user", "content": query}]}):
+    # for step in email_agent.stream({"messages": [HumanMessage(query)]}):
     #     for update in step.values():
     #         for message in update.get("messages", []):
     #             message.pretty_print()
 
-    # query = "Schedule a team standup for tomorrow at 9am"
-    # for step in supervisor_agent.stream({"messages": [{"role": "user", "content": query}]}):
-    #     for update in step.values():
-    #         for message in update.get("messages", []):
-    #             message.pretty_print()
+    # The supervisor's tools are async, so it has to be streamed asynchronously; independent
+    # tool calls issued in the same turn are then awaited concurrently
+    async def run_supervisor(query: str) -> None:
+        async for step in supervisor_agent.astream({"messages": [HumanMessage(query)]}):
+            for update in step.values():
+                for message in update.get("messages", []):
+                    message.pretty_print()
+
+    # asyncio.run(run_supervisor("Schedule a team standup for tomorrow at 9am"))
 
     query = "Schedule a meeting with the design team next Tuesday at 2pm for 1 hour, and send them an email reminder about reviewing the new mockups."
-    for step in supervisor_agent.stream({"messages": [{"role": "user", "content": query}]}):
-        for update in step.values():
-            for message in update.get("messages", []):
-                message.pretty_print()
+    asyncio.run(run_supervisor(query))
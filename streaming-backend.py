@@ -1,13 +1,26 @@
 import asyncio
 import time
+from contextlib import asynccontextmanager
 from typing import AsyncIterator, Optional
 
+import orjson
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from starlette.responses import StreamingResponse
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # start new tasks eagerly so coroutines that finish (or progress) without suspending skip a loop round-trip;
+    # stock asyncio loops only, since uvloop's create_task rejects the eager_start argument the factory passes
+    loop = asyncio.get_running_loop()
+    if isinstance(loop, asyncio.BaseEventLoop):
+        loop.set_task_factory(asyncio.eager_task_factory)
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,54 +38,59 @@ class StreamRequest(BaseModel):
     delay_ms: int = Field(60, ge=0, le=2000, description="Artificial delay per token")
 
 
+# yield to the event loop after each SSE frame so fast producers don't get sent in batches;
+# turn off to trade per-event flushing for throughput at very high event rates
+FLUSH_EACH_EVENT = True
+
+
 def now_ms() -> int:
-    return int(time.time() * 1000)
+    # monotonic: only used for elapsed times, so it must not jump with the wall clock
+    return time.monotonic_ns() // 1_000_000
 
 
-def sse(event: str, data: str, event_id: int | None = None) -> str:
-    lines = []
-    if event_id is not None:
-        lines.append(f"id: {event_id}")
-    lines.append(f"event: {event}")
-    lines.append(f"data: {data}")
-    return "\n".join(lines) + "\n\n"
+# "event: <name>\ndata: " prefixes for the event types this stream emits, encoded once
+_SSE_PREFIXES = {name: f"event: {name}\ndata: ".encode() for name in ("ping", "token", "done")}
 
 
-async def token_stream(text: str, delay_ms: int, last_event_id: Optional[int]) -> AsyncIterator[str]:
+def sse(event: str, data: bytes, event_id: int | None = None) -> bytes:
+    prefix = _SSE_PREFIXES.get(event) or f"event: {event}\ndata: ".encode()
+    if event_id is None:
+        return prefix + data + b"\n\n"
+    return b"id: %d\n%s%s\n\n" % (event_id, prefix, data)
+
+
+async def token_stream(text: str, delay_ms: int, last_event_id: Optional[int]) -> AsyncIterator[bytes]:
     start_ms = now_ms()
     tokens = text.split(" ")
     if len(tokens) == 1 and tokens[0] == "":
         done = {"elapsed_ms": now_ms() - start_ms, "tokens": 0}
-        yield sse("done", json_dumps(done), event_id=1)
+        yield sse("done", orjson.dumps(done), event_id=1)
         return
     token_count = len(tokens)
     if last_event_id is not None and last_event_id >= token_count + 1:
         done = {"elapsed_ms": now_ms() - start_ms, "tokens": token_count}
-        yield sse("done", json_dumps(done), event_id=token_count + 1)
+        yield sse("done", orjson.dumps(done), event_id=token_count + 1)
         return
 
     start_index = 1
     if last_event_id is not None:
         start_index = max(1, last_event_id + 1)
 
-    for i in range(start_index, token_count + 1):
+    # sleep until absolute per-token deadlines so the cadence doesn't drift under load
+    loop = asyncio.get_running_loop()
+    delay = delay_ms / 1000.0
+    start = loop.time()
+    for step, i in enumerate(range(start_index, token_count + 1), start=1):
         tok = tokens[i - 1]
-        await asyncio.sleep(delay_ms / 1000.0)
+        await asyncio.sleep(max(0.0, start + step * delay - loop.time()))
         payload = {
-            "token": tok + (" " if i < len(tokens) else ""),
+            "token": tok + (" " if i < token_count else ""),
             "index": i,
             "elapsed_ms": now_ms() - start_ms,
         }
-        yield sse("token", json_dumps(payload), event_id=i)
-    done = {"elapsed_ms": now_ms() - start_ms, "tokens": len(tokens)}
-    yield sse("done", json_dumps(done), event_id=len(tokens) + 1)
-
-
-def json_dumps(obj: object) -> str:
-    # tiny local wrapper so we don't have to import a full JSON encoder class
-    import json
-
-    return json.dumps(obj, separators=(",", ":"))
+        yield sse("token", orjson.dumps(payload), event_id=i)
+    done = {"elapsed_ms": now_ms() - start_ms, "tokens": token_count}
+    yield sse("done", orjson.dumps(done), event_id=token_count + 1)
 
 
 @app.post("/stream")
@@ -85,14 +103,18 @@ async def stream_endpoint(body: StreamRequest, request: Request):
         except ValueError:
             last_id = None
 
-    async def gen() -> AsyncIterator[str]:
+    async def gen() -> AsyncIterator[bytes]:
         # initial ping to reduce time-to-first-byte
-        yield sse("ping", json_dumps({"ts_ms": now_ms()}), event_id=0)
+        yield sse("ping", orjson.dumps({"ts_ms": time.time_ns() // 1_000_000}), event_id=0)
+        if FLUSH_EACH_EVENT:
+            await asyncio.sleep(0)
 
         async for chunk in token_stream(body.text, body.delay_ms, last_id):
             if await request.is_disconnected():
                 break
             yield chunk
+            if FLUSH_EACH_EVENT:
+                await asyncio.sleep(0)
 
     headers = {
         "Cache-Control": "no-cache",
@@ -1,4 +1,5 @@
 import asyncio
+import bisect
 import random
 import statistics
 import time
@@ -10,6 +11,11 @@ import numpy as np
 from datasketch import HyperLogLog
 from probables import CountMinSketch
 
+try:
+    import uvloop  # optional: lower per-callback overhead than the default selector loop
+except ImportError:
+    uvloop = None
+
 MAX_WINDOW_SIZE = 1000
 
 BATCH_SIZE = 100
@@ -26,6 +32,7 @@ class Event:
     """Single event in the stream."""
 
     user_id: int
+    user_id_bytes: bytes  # pre-encoded once by the producer for the sketches
     value: float
     timestamp: float
 
@@ -38,6 +45,7 @@ class Stats:
         self.cms = CountMinSketch(width=1000, depth=5)
         self.value_window = deque(maxlen=window_size)
         self.latency_window = deque(maxlen=window_size)
+        self.latency_sorted: list[float] = []  # same values as latency_window, kept in sorted order
 
         # Welford's algorithm for rolling mean/variance
         self.n = 0
@@ -46,28 +54,50 @@ class Stats:
 
     def update(self, event: Event) -> None:
         """Update all streaming stats with one event."""
-        user_id = str(event.user_id)
-        latency = time.time() - event.timestamp
-
-        self.hll.update(user_id.encode("utf-8"))
-        self.cms.add(user_id)
-        self.value_window.append(event.value)
+        self.update_batch([event])
+
+    def update_batch(self, events: list[Event]) -> None:
+        """Update all streaming stats with a batch of events."""
+        if not events:
+            return
+        now = time.monotonic()
+        values = np.fromiter((e.value for e in events), dtype=np.float64, count=len(events))
+        timestamps = np.fromiter((e.timestamp for e in events), dtype=np.float64, count=len(events))
+
+        for event in events:
+            self.hll.update(event.user_id_bytes)
+            self.cms.add(event.user_id_bytes)
+        self.value_window.extend(values.tolist())
+        for latency in (now - timestamps).tolist():
+            self.record_latency(latency)
+
+        # Chan et al. parallel combine of the batch mean/M2 into the running Welford state
+        b_n = len(values)
+        b_mean = float(values.mean())
+        b_M2 = float(((values - b_mean) ** 2).sum())
+        n = self.n + b_n
+        delta = b_mean - self.mean
+        self.mean += delta * b_n / n
+        self.M2 += b_M2 + delta * delta * self.n * b_n / n
+        self.n = n
+
+    def record_latency(self, latency: float) -> None:
+        """Add a latency to the rolling window, evicting the oldest from the sorted view."""
+        if len(self.latency_window) == self.latency_window.maxlen:
+            evicted = self.latency_window[0]
+            del self.latency_sorted[bisect.bisect_left(self.latency_sorted, evicted)]
         self.latency_window.append(latency)
-
-        self.n += 1
-        delta = event.value - self.mean
-        self.mean += delta / self.n
-        self.M2 += delta * (event.value - self.mean)
+        bisect.insort(self.latency_sorted, latency)
 
     def latency_percentiles(self) -> tuple[float, float, float]:
         """Return p50/p95/p99 latencies in milliseconds."""
-        if not self.latency_window:
+        n = len(self.latency_sorted)
+        if not n:
             return (0.0, 0.0, 0.0)
-        latencies = np.array(self.latency_window)
         return (
-            float(np.percentile(latencies, 50) * 1000),
-            float(np.percentile(latencies, 95) * 1000),
-            float(np.percentile(latencies, 99) * 1000),
+            self.latency_sorted[int(0.50 * n)] * 1000,
+            self.latency_sorted[int(0.95 * n)] * 1000,
+            self.latency_sorted[int(0.99 * n)] * 1000,
         )
 
 
@@ -120,10 +150,12 @@ class Dashboard:
 async def publisher(queue: asyncio.Queue[Event]) -> None:
     """Push events into the queue at a steady rate."""
     while True:
+        user_id = random.randint(1, 5000)
         event = Event(
-            user_id=random.randint(1, 5000),
+            user_id=user_id,
+            user_id_bytes=str(user_id).encode("utf-8"),
             value=random.gauss(50, 10),
-            timestamp=time.time(),
+            timestamp=time.monotonic(),
         )
         await queue.put(event)  # blocks if full
         await asyncio.sleep(0.02 * random.random())  # ~100 events/sec
@@ -136,8 +168,7 @@ def process_batch(
     queue: asyncio.Queue[Event],
 ) -> None:
     """Update stats for a batch, then render dashboard and alerts."""
-    for event in events:
-        stats.update(event)
+    stats.update_batch(events)
     p50, p95, p99 = stats.latency_percentiles()
     dashboard.record_p99(p99)
     dashboard.push(
@@ -157,22 +188,28 @@ def process_batch(
 async def batcher(queue: asyncio.Queue[Event], batch_size: int, max_delay: float) -> AsyncIterator[list[Event]]:
     """Yield event batches based on size or max delay."""
     buffer = []
-    start = time.time()
+    start = time.monotonic()
 
     while True:
         try:
             event = await asyncio.wait_for(queue.get(), timeout=max_delay)
             buffer.append(event)
-
-            if len(buffer) >= batch_size or (time.time() - start) >= max_delay:
+            # drain whatever is already queued without going back through the scheduler
+            while len(buffer) < batch_size:
+                try:
+                    buffer.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            if len(buffer) >= batch_size or (time.monotonic() - start) >= max_delay:
                 yield buffer
                 buffer = []
-                start = time.time()
+                start = time.monotonic()
         except asyncio.TimeoutError:
             if buffer:
                 yield buffer
                 buffer = []
-                start = time.time()
+                start = time.monotonic()
 
 
 async def subscriber(
@@ -191,7 +228,10 @@ async def main() -> None:
     queue = asyncio.Queue(maxsize=10)  # simulated pub-sub queue with bounded size for backpressure
     stats = Stats(window_size=MAX_WINDOW_SIZE)
     dashboard = Dashboard(history_size=DASHBOARD_HISTORY)
+    loop = asyncio.get_running_loop()
+    if isinstance(loop, asyncio.BaseEventLoop):  # uvloop's create_task rejects eager_start
+        loop.set_task_factory(asyncio.eager_task_factory)
     await asyncio.gather(publisher(queue), subscriber(queue, stats, dashboard))
 
 
-asyncio.run(main())
+asyncio.run(main(), loop_factory=uvloop.new_event_loop if uvloop else None)